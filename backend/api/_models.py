@@ -0,0 +1,38 @@
+from typing import Any, Dict, Type
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Request models shared by the demo routers, so each schema is compiled once,
+# and the body parser used by both the routers and main.py
+
+class CodeRequest(BaseModel):
+    code: str
+    language: str = "python"
+
+class CreateRequest(BaseModel):
+    filename: str
+    content: str = ""
+
+CODE_REQ_ADAPTER = TypeAdapter(CodeRequest)
+CREATE_REQ_ADAPTER = TypeAdapter(CreateRequest)
+
+def json_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """openapi_extra documenting model as the JSON body of a route that uses parse_body"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
+
+async def parse_body(request: Request, adapter: TypeAdapter):
+    """Validate the raw JSON body against a cached TypeAdapter"""
+    try:
+        return adapter.validate_json(await request.body())
+    except ValidationError as e:
+        # Match FastAPI's own body validation errors, which are located under "body"
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter(prefix="/analyze", tags=["analyze"])
+from ._models import CODE_REQ_ADAPTER, CodeRequest, json_body_openapi, parse_body
 
-class AnalyzeRequest(BaseModel):
-    code: str
-    language: str = "python"
+router = APIRouter(prefix="/analyze", tags=["analyze"], default_response_class=ORJSONResponse)
 
-@router.post("")
-def analyze_code(req: AnalyzeRequest):
+@router.post("", openapi_extra=json_body_openapi(CodeRequest))
+async def analyze_code(request: Request):
     # Demo-only: pretend to analyze code and return a message
+    req = await parse_body(request, CODE_REQ_ADAPTER)
     if not req.code:
         raise HTTPException(status_code=400, detail="code is required")
     return {"status": "success", "action": "analyze", "language": req.language, "lines": req.code.count('\n') + 1}
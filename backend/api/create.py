@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter(prefix="/create", tags=["create"])
+from ._models import CREATE_REQ_ADAPTER, CreateRequest, json_body_openapi, parse_body
 
-class CreateRequest(BaseModel):
-    filename: str
-    content: str = ""
+router = APIRouter(prefix="/create", tags=["create"], default_response_class=ORJSONResponse)
 
-@router.post("")
-def create_file(req: CreateRequest):
+@router.post("", openapi_extra=json_body_openapi(CreateRequest))
+async def create_file(request: Request):
     # Demo-only: pretend to create a file and return a message
+    req = await parse_body(request, CREATE_REQ_ADAPTER)
     if not req.filename:
         raise HTTPException(status_code=400, detail="filename is required")
     return {"status": "success", "action": "create", "filename": req.filename, "bytes": len(req.content)}
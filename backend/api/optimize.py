@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter(prefix="/optimize", tags=["optimize"])
+from ._models import CODE_REQ_ADAPTER, CodeRequest, json_body_openapi, parse_body
 
-class OptimizeRequest(BaseModel):
-    code: str
-    language: str = "python"
+router = APIRouter(prefix="/optimize", tags=["optimize"], default_response_class=ORJSONResponse)
 
-@router.post("")
-def optimize_code(req: OptimizeRequest):
+@router.post("", openapi_extra=json_body_openapi(CodeRequest))
+async def optimize_code(request: Request):
     # Demo-only: pretend to optimize code and return a message
+    req = await parse_body(request, CODE_REQ_ADAPTER)
     if not req.code:
         raise HTTPException(status_code=400, detail="code is required")
     return {"status": "success", "action": "optimize", "language": req.language, "optimized": True}
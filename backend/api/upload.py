@@ -1,7 +1,8 @@
 from fastapi import APIRouter, UploadFile, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/upload", tags=["upload"])
+router = APIRouter(prefix="/upload", tags=["upload"], default_response_class=ORJSONResponse)
 
 @router.post("")
 def upload_file(file: UploadFile):
@@ -1,18 +1,34 @@
 import os
 import io
 import ast
+import re
+import asyncio
+import tempfile
 import time
-import json
 import shutil
 import hashlib
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field, validator
+import orjson
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from pydantic import BaseModel, Field, TypeAdapter, validator
+from starlette.datastructures import UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from api._models import json_body_openapi, parse_body
+except ModuleNotFoundError:
+    # Imported as backend.main from the repository root
+    from backend.api._models import json_body_openapi, parse_body
 
 # --- Configuration and Directories ---
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,29 +37,147 @@ FILES_DIR.mkdir(exist_ok=True)
 ANALYSIS_DIR = BASE_DIR / "analysis_results"
 ANALYSIS_DIR.mkdir(exist_ok=True)
 
+# Set MARVIN_PERSIST_ANALYSIS=1 to keep analysis reports in ANALYSIS_DIR
+PERSIST_ANALYSIS = os.environ.get("MARVIN_PERSIST_ANALYSIS") == "1"
+
+# Uploadable file extensions and the language each maps to
+ALLOWED_EXTS = {"py": "python"}
+UNSUPPORTED_FILE_DETAIL = f"Only {', '.join('.' + ext for ext in ALLOWED_EXTS)} files are supported"
+
+# File IDs are a hex digest of this many bytes over language and content (12 hex chars)
+FILE_ID_BYTES = 6
+
+# Largest accepted upload in bytes; set MARVIN_MAX_UPLOAD_BYTES to override
+MAX_UPLOAD_BYTES = int(os.environ.get("MARVIN_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and part headers around the file itself
+MAX_UPLOAD_BODY_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+
+# Number of analysis results kept in memory, keyed by file_id
+ANALYSIS_CACHE_SIZE = 512
+
+# Sources at least this long are analyzed and optimized in a worker process;
+# smaller ones are cheaper to handle inline than to pickle across
+CPU_POOL_MIN_SIZE = 100 * 1024
+
+# Whole lines (with their newline) that call print(), unless commented out
+_PRINT_LINE_RE = re.compile(r"^(?![^\S\n]*#)[^\n]*print\([^\n]*\n?", re.MULTILINE)
+
+# AST node types counted as functions and imports by the analyzer
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+_IMPORT_NODES = (ast.Import, ast.ImportFrom)
+
+# Node fields holding statements, except handlers or match cases
+_STATEMENT_FIELDS = frozenset({"body", "orelse", "finalbody", "handlers", "cases"})
+
+# --- CPU Pool ---
+# Worker processes for analyzing and optimizing sources of at least
+# CPU_POOL_MIN_SIZE characters. The pool is created by the first request that
+# needs it, so hosts that can't run one (no SemLock, e.g. AWS Lambda) still start.
+# By then worker threads exist, so workers are never forked from this process:
+# they start from a clean forkserver (or spawn) and re-import main on startup.
+_CPU_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_CPU_POOL: Optional[ProcessPoolExecutor] = None
+_CPU_POOL_UNAVAILABLE = False
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the worker pool, creating it on first use; None if it can't be started"""
+    global _CPU_POOL, _CPU_POOL_UNAVAILABLE
+    if _CPU_POOL is None and not _CPU_POOL_UNAVAILABLE:
+        try:
+            _CPU_POOL = ProcessPoolExecutor(mp_context=multiprocessing.get_context(_CPU_POOL_START_METHOD))
+        except (ImportError, NotImplementedError, OSError):
+            _CPU_POOL_UNAVAILABLE = True
+    return _CPU_POOL
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if _CPU_POOL is not None:
+        _CPU_POOL.shutdown(cancel_futures=True)
+
 # --- App setup ---
 app = FastAPI(
     title="MARVIN API", 
     description="AI-Powered Code Editor API", 
-    version="1.1.0"
+    version="1.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Templates setup
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+# The landing page is static, so it is read once and served as-is
+_INDEX_HTML = (BASE_DIR / "templates" / "index.html").read_bytes()
 
-# CORS middleware configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# --- Middleware ---
+# Headers shared by every preflight answer; the origin is echoed per request
+_CORS_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    (b"vary", b"Origin"),
+    (b"content-length", b"0"),
+]
+
+class AllowAllCORSMiddleware:
+    """Allow cross-origin requests from any origin, with credentials.
+
+    Preflight requests are answered directly without entering the router;
+    other requests only get the allow-origin headers added to their response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        origin = request_headers = None
+        is_preflight = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                is_preflight = scope["method"] == "OPTIONS"
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+        
+        if is_preflight:
+            headers = [(b"access-control-allow-origin", origin), *_CORS_PREFLIGHT_HEADERS]
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"access-control-allow-origin", origin),
+                    (b"access-control-allow-credentials", b"true"),
+                    (b"vary", b"Origin"),
+                ]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+
+app.add_middleware(AllowAllCORSMiddleware)
+
+# Compress larger responses such as the code echoed back by /api/optimize
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # Add exception handler to always return JSON instead of HTML
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -80,11 +214,240 @@ class OptimizationResponse(BaseModel):
     changes: List[Dict[str, str]]
     metrics: Dict[str, Any]
 
+# --- Request Parsing ---
+# Validators are compiled once at import and reused by every request
+_ANALYSIS_REQ_ADAPTER = TypeAdapter(CodeAnalysisRequest)
+_OPTIMIZATION_REQ_ADAPTER = TypeAdapter(OptimizationRequest)
+
+# --- Uploaded File Index ---
+# Maps file_id to its stored path so lookups rarely have to scan FILES_DIR
+_FILE_INDEX: Dict[str, Path] = {}
+
+def _reload_index() -> None:
+    """Rebuild the file index from a single scan of FILES_DIR"""
+    _FILE_INDEX.clear()
+    with os.scandir(FILES_DIR) as entries:
+        for entry in entries:
+            file_id, sep, _ = entry.name.partition("_")
+            if sep and not entry.name.startswith(".") and entry.is_file():
+                _FILE_INDEX.setdefault(file_id, Path(entry.path))
+
+_reload_index()
+
+def _scan_for_file(file_id: str) -> Optional[Path]:
+    prefix = f"{file_id}_"
+    with os.scandir(FILES_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix) and entry.is_file():
+                return Path(entry.path)
+    return None
+
+async def find_uploaded_file(file_id: str) -> Path:
+    """Return the stored path for file_id, or raise 404.
+
+    Other worker processes may have stored the file after this one built its
+    index, so a miss falls back to one scan of FILES_DIR before giving up.
+    """
+    file_path = _FILE_INDEX.get(file_id)
+    if file_path is None:
+        file_path = await asyncio.to_thread(_scan_for_file, file_id)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        _FILE_INDEX[file_id] = file_path
+    return file_path
+
+# --- Language Detection ---
+@lru_cache(maxsize=4096)
+def detect_language(filename: str) -> Optional[str]:
+    """Map a filename to its language by extension, or None if unsupported"""
+    _, dot, ext = filename.rpartition(".")
+    return ALLOWED_EXTS.get(ext.lower()) if dot else None
+
+# --- Analysis Cache ---
+# Analysis results keyed by file_id, least recently used first. File IDs are
+# digests of the language and content, and stored files are never modified, so
+# entries don't go stale.
+_ANALYSIS_CACHE: "OrderedDict[str, Tuple[Dict[str, int], List[Dict[str, str]]]]" = OrderedDict()
+
+def get_cached_analysis(file_id: str) -> Optional[Tuple[Dict[str, int], List[Dict[str, str]]]]:
+    result = _ANALYSIS_CACHE.get(file_id)
+    if result is not None:
+        _ANALYSIS_CACHE.move_to_end(file_id)
+    return result
+
+def cache_analysis(file_id: str, result: Tuple[Dict[str, int], List[Dict[str, str]]]) -> None:
+    _ANALYSIS_CACHE[file_id] = result
+    if len(_ANALYSIS_CACHE) > ANALYSIS_CACHE_SIZE:
+        _ANALYSIS_CACHE.popitem(last=False)
+
+def _read_fresh_report(report: Path, source: Path) -> Optional[bytes]:
+    """Return a persisted report if it is at least as new as its source file"""
+    try:
+        if report.stat().st_mtime >= source.stat().st_mtime:
+            return report.read_bytes()
+    except FileNotFoundError:
+        pass
+    return None
+
+# --- Text Helpers ---
+def count_lines(code: str) -> int:
+    """Count lines of newline-normalized text without building a list of them"""
+    if not code:
+        return 0
+    return code.count("\n") + (0 if code.endswith("\n") else 1)
+
+# --- File Helpers ---
+def copy_upload(src: BinaryIO, dst: BinaryIO, hasher: Any, buffer_size: int) -> int:
+    """Copy src to dst in buffer_size chunks, hashing on the way; returns the byte count.
+
+    Sources with readinto() are read into one preallocated buffer. Others are
+    copied chunk by chunk as read (SpooledTemporaryFile lacks readinto() before
+    Python 3.11).
+    """
+    size = 0
+    readinto = getattr(src, "readinto", None)
+    if readinto is None:
+        while data := src.read(buffer_size):
+            size += len(data)
+            hasher.update(data)
+            dst.write(data)
+        return size
+    
+    view = memoryview(bytearray(buffer_size))
+    while n := readinto(view):
+        chunk = view[:n]
+        hasher.update(chunk)
+        dst.write(chunk)
+        size += n
+    return size
+
+def _write_upload(src: BinaryIO, path: Path, hasher: Any, buffer_size: int) -> int:
+    with open(path, "wb") as f:
+        return copy_upload(src, f, hasher, buffer_size)
+
+def limit_receive(receive: Receive, max_bytes: int) -> Receive:
+    """Wrap an ASGI receive so a request body longer than max_bytes ends in a 413."""
+    received = 0
+    
+    async def limited_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail="File too large")
+        return message
+    
+    return limited_receive
+
+def _sync_write(path: Path, content: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+async def read_source(path: Path) -> str:
+    """Read an uploaded source file as text in a worker thread"""
+    try:
+        return await asyncio.to_thread(path.read_text, encoding="utf-8")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+async def safe_write_file(path: Path, content: bytes) -> None:
+    """Atomically replace path with content, doing the disk I/O in a worker thread.
+
+    The data is not fsynced: the rename is atomic but not durable across a crash.
+    """
+    await asyncio.to_thread(_sync_write, path, content)
+
+# --- Analysis and Optimization ---
+def analyze_python(code: str) -> Tuple[Dict[str, int], List[Dict[str, str]]]:
+    """Parse Python source and return its summary counts and detected issues.
+
+    Only plain dicts and lists are returned, so the call can run in the worker pool
+    without pickling the tree back to the event loop process.
+    """
+    tree = ast.parse(code)
+    
+    # Collect counts and issues in a single breadth-first walk, like ast.walk,
+    # but only through statement lists: expressions never contain the nodes
+    # counted here, so their subtrees are skipped entirely
+    functions = classes = imports = 0
+    issues = []
+    
+    queue = deque([tree])
+    while queue:
+        node = queue.popleft()
+        for field in node._fields:
+            if field in _STATEMENT_FIELDS:
+                queue.extend(getattr(node, field))
+        
+        if isinstance(node, _FUNCTION_NODES):
+            functions += 1
+            if not ast.get_docstring(node):
+                issues.append({"type": "missing_docstring", "message": f"Function {node.name} lacks a docstring"})
+        elif isinstance(node, ast.ClassDef):
+            classes += 1
+        elif isinstance(node, _IMPORT_NODES):
+            imports += 1
+        elif isinstance(node, ast.ExceptHandler) and node.type is None:
+            issues.append({"type": "bare_except", "message": "Bare except clause detected"})
+    
+    summary = {
+        "total_lines": count_lines(code),
+        "functions": functions,
+        "classes": classes,
+        "imports": imports,
+    }
+    return summary, issues
+
+def analyze_default(code: str) -> Tuple[Dict[str, int], List[Dict[str, str]]]:
+    """Fallback analyzer for languages without a dedicated one: line count only"""
+    return {"total_lines": count_lines(code)}, []
+
+# Analyzers by language, as returned by detect_language
+_ANALYZERS: Dict[str, Callable[[str], Tuple[Dict[str, int], List[Dict[str, str]]]]] = {
+    "python": analyze_python,
+}
+
+def optimize_python(code: str, optimization_type: str) -> Tuple[str, List[Dict[str, str]]]:
+    """Return the optimized source and the list of changes applied to it"""
+    optimized_code = code
+    changes = []
+    
+    # Simple optimization example
+    if optimization_type == "performance":
+        if "print(" in code:
+            optimized_code, removed = _PRINT_LINE_RE.subn("", code)
+            if removed:
+                changes.append({
+                    "type": "removed_debug_prints",
+                    "description": "Removed debug print statements"
+                })
+    return optimized_code, changes
+
+async def run_cpu_bound(func: Callable[..., Any], code: str, *args: Any) -> Any:
+    """Call func(code, *args), in the worker pool when the source is large enough.
+
+    Large sources go to a worker process so they don't hold the GIL on the
+    event loop; small ones, or all of them when no pool can be started, run inline.
+    """
+    if len(code) >= CPU_POOL_MIN_SIZE:
+        pool = get_cpu_pool()
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, func, code, *args)
+    return func(code, *args)
+
 # --- Root endpoint ---
 @app.get("/")
-async def root(request: Request):
-    """Render the landing page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+async def root():
+    """Serve the landing page"""
+    return HTMLResponse(_INDEX_HTML)
 
 # --- Health Check ---
 @app.get("/api/health")
@@ -92,71 +455,115 @@ async def health_check():
     return {"status": "healthy", "timestamp": time.time()}
 
 # --- File Upload Endpoint ---
-@app.post("/api/upload", response_model=FileUploadResponse)
-async def upload_code_file(file: UploadFile = File(...)):
-    if not file.filename.endswith(".py"):
-        raise HTTPException(status_code=400, detail="Only .py files are supported")
-    
-    # Generate unique file ID
-    file_id = hashlib.md5(f"{file.filename}{time.time()}".encode()).hexdigest()[:12]
+_UPLOAD_BODY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+@app.post(
+    "/api/upload",
+    response_model=None,
+    responses={200: {"model": FileUploadResponse}},
+    openapi_extra=_UPLOAD_BODY_OPENAPI,
+)
+async def upload_code_file(request: Request):
+    # The form is parsed here rather than through a File(...) parameter so the
+    # size limit applies while the body is read, not after it has been spooled
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    request = Request(request.scope, limit_receive(request.receive, MAX_UPLOAD_BODY_BYTES))
+    async with request.form() as form:
+        return await _store_upload(form.get("file"))
+
+async def _store_upload(file: Any) -> ORJSONResponse:
+    if not isinstance(file, UploadFile):
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body", "file"), "msg": "Field required", "input": None}
+        ])
+    language = detect_language(file.filename)
+    if language is None:
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_FILE_DETAIL)
     
-    # Save the file
-    file_path = FILES_DIR / f"{file_id}_{file.filename}"
-    content = await file.read()
+    # The body limit leaves room for multipart framing; this is the exact file limit
+    if file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Stream the upload to a temp file, hashing it chunk by chunk
+    # BLAKE2b is faster than SHA-256 in software and emits exactly the ID length
+    # The language is hashed first: the analysis depends on it as well as the
+    # content, so the same bytes under another extension get their own file ID
+    hasher = hashlib.blake2b(digest_size=FILE_ID_BYTES, usedforsecurity=False)
+    hasher.update(language.encode() + b"\0")
+    tmp_path = FILES_DIR / f".upload-{os.getpid()}-{time.time_ns()}"
+    try:
+        buffer_size = min(file.size or UPLOAD_CHUNK_SIZE, UPLOAD_CHUNK_SIZE)
+        size = await asyncio.to_thread(_write_upload, file.file, tmp_path, hasher, buffer_size)
+        
+        # The file ID is derived from the language and content hash
+        file_id = hasher.hexdigest()
+        file_path = FILES_DIR / f"{file_id}_{file.filename}"
+        os.replace(tmp_path, file_path)
+        _FILE_INDEX[file_id] = file_path
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
     
-    return JSONResponse({
+    return ORJSONResponse({
         "file_id": file_id,
         "filename": file.filename,
-        "size": len(content),
+        "size": size,
         "message": "File uploaded successfully"
     })
 
 # --- Code Analysis Endpoint ---
-@app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_code(req: CodeAnalysisRequest):
-    # Find the file
-    matching_files = list(FILES_DIR.glob(f"{req.file_id}_*"))
-    if not matching_files:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    file_path = matching_files[0]
-    
-    # Read and parse the file
-    with open(file_path, "r", encoding="utf-8") as f:
-        code = f.read()
-    
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        raise HTTPException(status_code=400, detail=f"Syntax error: {str(e)}")
+@app.post(
+    "/api/analyze",
+    response_model=None,
+    responses={200: {"model": AnalysisResponse}},
+    openapi_extra=json_body_openapi(CodeAnalysisRequest),
+)
+async def analyze_code(request: Request):
+    req = await parse_body(request, _ANALYSIS_REQ_ADAPTER)
     
-    # Perform analysis
-    summary = {
-        "total_lines": len(code.splitlines()),
-        "functions": len([n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]),
-        "classes": len([n for n in ast.walk(tree) if isinstance(n, ast.ClassDef)]),
-        "imports": len([n for n in ast.walk(tree) if isinstance(n, (ast.Import, ast.ImportFrom))]),
-    }
+    file_path = await find_uploaded_file(req.file_id)
     
-    issues = []
-    suggestions = []
+    analysis_file = ANALYSIS_DIR / f"{req.file_id}_analysis.json"
+    cached = get_cached_analysis(req.file_id)
+    if cached is None and PERSIST_ANALYSIS:
+        # A persisted report is reused while it is newer than the source
+        report = await asyncio.to_thread(_read_fresh_report, analysis_file, file_path)
+        if report is not None:
+            report_data = orjson.loads(report)
+            cached = (report_data["summary"], report_data["issues"])
+            cache_analysis(req.file_id, cached)
     
-    # Check for common issues
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef) and not ast.get_docstring(node):
-            issues.append({"type": "missing_docstring", "message": f"Function {node.name} lacks a docstring"})
+    if cached is not None:
+        summary, issues = cached
+    else:
+        code = await read_source(file_path)
         
-        if isinstance(node, ast.ExceptHandler) and node.type is None:
-            issues.append({"type": "bare_except", "message": "Bare except clause detected"})
+        try:
+            analyzer = _ANALYZERS.get(detect_language(file_path.name), analyze_default)
+            summary, issues = await run_cpu_bound(analyzer, code)
+        except (SyntaxError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Syntax error: {str(e)}")
+        cache_analysis(req.file_id, (summary, issues))
     
+    suggestions = []
     suggestions.append("Consider adding type hints to function parameters")
     suggestions.append("Ensure all functions have descriptive docstrings")
     
-    # Save analysis results
-    analysis_file = ANALYSIS_DIR / f"{req.file_id}_analysis.json"
     analysis_data = {
         "file_id": req.file_id,
         "summary": summary,
@@ -165,44 +572,39 @@ async def analyze_code(req: CodeAnalysisRequest):
         "timestamp": time.time()
     }
     
-    with open(analysis_file, "w") as f:
-        json.dump(analysis_data, f, indent=2)
+    # The report is returned inline; keeping a copy on disk is opt-in
+    if PERSIST_ANALYSIS and cached is None:
+        await safe_write_file(analysis_file, orjson.dumps(analysis_data))
     
-    return JSONResponse(analysis_data)
+    return ORJSONResponse(analysis_data)
 
 # --- Code Optimization Endpoint ---
-@app.post("/api/optimize", response_model=OptimizationResponse)
-async def optimize_code(req: OptimizationRequest):
-    matching_files = list(FILES_DIR.glob(f"{req.file_id}_*"))
-    if not matching_files:
-        raise HTTPException(status_code=404, detail="File not found")
+@app.post(
+    "/api/optimize",
+    response_model=None,
+    responses={200: {"model": OptimizationResponse}},
+    openapi_extra=json_body_openapi(OptimizationRequest),
+)
+async def optimize_code(request: Request):
+    req = await parse_body(request, _OPTIMIZATION_REQ_ADAPTER)
     
-    file_path = matching_files[0]
-    with open(file_path, "r", encoding="utf-8") as f:
-        original_code = f.read()
+    file_path = await find_uploaded_file(req.file_id)
     
-    optimized_code = original_code
-    changes = []
+    original_code = await read_source(file_path)
     
-    # Simple optimization example
-    if req.optimization_type == "performance":
-        if "print(" in original_code:
-            optimized_code = "\n".join(
-                line for line in original_code.splitlines()
-                if "print(" not in line or line.strip().startswith("#")
-            )
-            changes.append({
-                "type": "removed_debug_prints",
-                "description": "Removed debug print statements"
-            })
+    optimized_code, changes = await run_cpu_bound(optimize_python, original_code, req.optimization_type)
     
+    # When optimize_python ran inline, unchanged code comes back as the same
+    # object and isn't counted twice; pool results are copies and get recounted
+    original_lines = count_lines(original_code)
+    optimized_lines = original_lines if optimized_code is original_code else count_lines(optimized_code)
     metrics = {
-        "original_lines": len(original_code.splitlines()),
-        "optimized_lines": len(optimized_code.splitlines()),
+        "original_lines": original_lines,
+        "optimized_lines": optimized_lines,
         "reduction": len(original_code) - len(optimized_code)
     }
     
-    return JSONResponse({
+    return ORJSONResponse({
         "file_id": req.file_id,
         "optimized_code": optimized_code,
         "changes": changes,